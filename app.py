@@ -2,22 +2,35 @@
 import logging
 import os
 import json
-from datetime import datetime
+import secrets
+import threading
 from uuid import uuid4
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Literal, Optional
 from pathlib import Path
 from urllib.parse import quote
 
-import boto3
-from botocore.config import Config
 from botocore.exceptions import ClientError
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, Header, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
 from dotenv import load_dotenv
 
+from document_store import (
+    DocumentRecord,
+    DocumentRecords,
+    STATUS_UPLOADED,
+    build_s3_key,
+    dump_records,
+    intern_status,
+    load_records,
+)
+from instrumentation import sample_stacks, span, start_request
+from s3_config import create_s3_client, s3_settings
+from zip_stream import ZipEntry, iter_zip, unique_names
+
 # Carregar variáveis de ambiente
 load_dotenv()
 
@@ -27,26 +40,17 @@ BUCKET = os.environ.get("S3_BUCKET_NAME")
 PRESIGN_UPLOAD_EXPIRES = int(os.environ.get("PRESIGNED_URL_EXPIRATION_UPLOAD", "900"))
 PRESIGN_DOWNLOAD_EXPIRES = int(os.environ.get("PRESIGNED_URL_EXPIRATION_DOWNLOAD", "3600"))
 DEBUG = os.environ.get("DEBUG", "False").lower() == "true"
+# Token exigido pelo endpoint /debug/profile (desabilitado se vazio)
+PROFILER_TOKEN = os.environ.get("PROFILER_TOKEN", "")
+# Download em lote (ZIP)
+ARCHIVE_PREFETCH_WINDOW = int(os.environ.get("ARCHIVE_PREFETCH_WINDOW", "4"))
+ARCHIVE_MAX_DOCUMENTS = int(os.environ.get("ARCHIVE_MAX_DOCUMENTS", "500"))
+ARCHIVE_CHUNK_SIZE = 256 * 1024
 
 # Validar configurações obrigatórias
 if not BUCKET:
     raise ValueError("S3_BUCKET_NAME não está configurado no arquivo .env")
 
-# Configurar cliente S3
-boto_config = Config(
-    retries={"max_attempts": 3, "mode": "standard"},
-    signature_version='s3v4'
-)
-
-s3_client = boto3.client(
-    "s3",
-    region_name=REGION,
-    aws_access_key_id=os.environ.get("AWS_ACCESS_KEY_ID"),
-    aws_secret_access_key=os.environ.get("AWS_SECRET_ACCESS_KEY"),
-    aws_session_token=os.environ.get("AWS_SESSION_TOKEN"),
-    config=boto_config
-)
-
 # Configurar logging
 logging.basicConfig(
     level=logging.DEBUG if DEBUG else logging.INFO,
@@ -54,6 +58,20 @@ logging.basicConfig(
 )
 logger = logging.getLogger("pdf-manager-api")
 
+# Configurar cliente S3 (S3_MAX_POOL_CONNECTIONS, S3_MAX_ATTEMPTS, S3_RETRY_MODE,
+# S3_ENDPOINT_URL; valores podem ser dimensionados com o s3_probe.py)
+S3_SETTINGS = s3_settings()
+# Uma conexão por download paralelo do ZIP, além das requisições normais
+S3_MAX_POOL_CONNECTIONS = S3_SETTINGS["max_pool_connections"]
+if ARCHIVE_PREFETCH_WINDOW + 2 > S3_MAX_POOL_CONNECTIONS:
+    logger.warning(
+        f"S3_MAX_POOL_CONNECTIONS={S3_MAX_POOL_CONNECTIONS} aumentado para "
+        f"{ARCHIVE_PREFETCH_WINDOW + 2} por causa de ARCHIVE_PREFETCH_WINDOW={ARCHIVE_PREFETCH_WINDOW}"
+    )
+    S3_MAX_POOL_CONNECTIONS = ARCHIVE_PREFETCH_WINDOW + 2
+
+s3_client = create_s3_client(max_pool_connections=S3_MAX_POOL_CONNECTIONS)
+
 # Criar diretório para metadados localmente
 METADATA_DIR = Path("data")
 METADATA_DIR.mkdir(exist_ok=True)
@@ -78,8 +96,28 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing"],
 )
 
+@app.middleware("http")
+async def request_timing(request: Request, call_next):
+    """Registra os spans da requisição no header Server-Timing e no log"""
+    timings = start_request()
+    response = await call_next(request)
+    response.headers["Server-Timing"] = timings.server_timing_header()
+    fields = timings.log_fields()
+    logger.info(
+        f"{request.method} {request.url.path} status={response.status_code} "
+        + " ".join(f"{name}={value}" for name, value in fields.items()),
+        extra={
+            "method": request.method,
+            "path": request.url.path,
+            "status_code": response.status_code,
+            "timings": fields,
+        },
+    )
+    return response
+
 # Modelos Pydantic
 class PresignUploadRequest(BaseModel):
     filename: str
@@ -108,32 +146,50 @@ class DocumentMetadata(BaseModel):
 class NotifyUploadRequest(BaseModel):
     documentId: str
     sizeBytes: int
-    status: str = "uploaded"
+    status: Literal["pending", "uploaded", "error"] = "uploaded"
+
+class ArchiveRequest(BaseModel):
+    documentIds: List[str]
 
 
 # Funções auxiliares para gerenciar metadados
-def load_metadata() -> Dict[str, Any]:
-    """Carrega metadados do arquivo JSON"""
+def load_metadata() -> DocumentRecords:
+    """
+    Carrega metadados do arquivo JSON como registros compactos
+    Erros de leitura são propagados para que nada seja salvo por cima dos dados;
+    entradas não reconhecidas são mantidas e gravadas de volta sem alteração
+    """
     try:
-        with open(METADATA_FILE, 'r') as f:
-            return json.load(f)
+        with span("load_metadata"):
+            return load_records(METADATA_FILE)
+    except FileNotFoundError:
+        return DocumentRecords()
     except Exception as e:
         logger.error(f"Erro ao carregar metadados: {e}")
-        return {}
+        raise
 
-def save_metadata(data: Dict[str, Any]):
+def save_metadata(data: Dict[str, DocumentRecord]):
     """Salva metadados no arquivo JSON"""
     try:
-        with open(METADATA_FILE, 'w') as f:
-            json.dump(data, f, indent=2)
+        with span("save_metadata"):
+            dump_records(data, METADATA_FILE)
     except Exception as e:
         logger.error(f"Erro ao salvar metadados: {e}")
         raise
 
+def json_response(content) -> JSONResponse:
+    """
+    Serializa a resposta dentro do span "serialize"
+    (o FastAPI não serializa de novo quando o handler retorna um Response)
+    """
+    with span("serialize"):
+        return JSONResponse(jsonable_encoder(content))
+
 def verify_s3_bucket():
     """Verifica se o bucket S3 existe e está acessível"""
     try:
-        s3_client.head_bucket(Bucket=BUCKET)
+        with span("s3_head_bucket"):
+            s3_client.head_bucket(Bucket=BUCKET)
         logger.info(f"Bucket S3 '{BUCKET}' verificado com sucesso")
         return True
     except ClientError as e:
@@ -169,12 +225,12 @@ def read_root():
 def health():
     """Health check"""
     bucket_ok = verify_s3_bucket()
-    return {
+    return json_response({
         "status": "ok" if bucket_ok else "degraded",
         "bucket": BUCKET,
         "region": REGION,
         "s3_accessible": bucket_ok
-    }
+    })
 
 @app.post("/api/presign-upload", response_model=PresignUploadResponse)
 async def presign_upload(req: PresignUploadRequest):
@@ -193,46 +249,41 @@ async def presign_upload(req: PresignUploadRequest):
         document_id = str(uuid4())
         
         # Gerar nome seguro para o arquivo
-        safe_filename = f"{document_id}_{req.filename}"
-        s3_key = f"documents/{safe_filename}"
+        s3_key = build_s3_key(document_id, req.filename)
         
         # Gerar URL pré-assinada para upload
         # IMPORTANTE: Não incluir Metadata aqui, pois o frontend teria que enviar
         # esses headers no PUT (x-amz-meta-*), causando erro 403 se não enviar
-        presigned_url = s3_client.generate_presigned_url(
-            ClientMethod="put_object",
-            Params={
-                "Bucket": BUCKET,
-                "Key": s3_key,
-                "ContentType": req.contentType
-            },
-            ExpiresIn=PRESIGN_UPLOAD_EXPIRES,
-        )
+        with span("presign"):
+            presigned_url = s3_client.generate_presigned_url(
+                ClientMethod="put_object",
+                Params={
+                    "Bucket": BUCKET,
+                    "Key": s3_key,
+                    "ContentType": req.contentType
+                },
+                ExpiresIn=PRESIGN_UPLOAD_EXPIRES,
+            )
         
         # Salvar metadados
         metadata = load_metadata()
         
-        metadata[document_id] = {
-            "documentId": document_id,
-            "filename": safe_filename,
-            "originalFilename": req.filename,
-            "contentType": req.contentType,
-            "s3Key": s3_key,
-            "uploadedAt": datetime.utcnow().isoformat(),
-            "status": "pending",
-            "sizeBytes": None
-        }
+        metadata[document_id] = DocumentRecord(
+            document_id=document_id,
+            original_filename=req.filename,
+            content_type=req.contentType,
+        )
         
         save_metadata(metadata)
         
         logger.info(f"URL pré-assinada gerada para upload: documentId={document_id}")
         
-        return PresignUploadResponse(
+        return json_response(PresignUploadResponse(
             uploadUrl=presigned_url,
             documentId=document_id,
             key=s3_key,
             expires=PRESIGN_UPLOAD_EXPIRES
-        )
+        ))
         
     except ClientError as e:
         logger.exception("Erro ao gerar URL pré-assinada")
@@ -257,18 +308,19 @@ async def notify_upload(req: NotifyUploadRequest):
             raise HTTPException(status_code=404, detail="Documento não encontrado")
         
         # Atualizar metadados
-        metadata[req.documentId]["status"] = req.status
-        metadata[req.documentId]["sizeBytes"] = req.sizeBytes
+        record = metadata[req.documentId]
+        record.status = intern_status(req.status)
+        record.size_bytes = req.sizeBytes
         
         save_metadata(metadata)
         
         logger.info(f"Upload notificado: documentId={req.documentId}, status={req.status}")
         
-        return {
+        return json_response({
             "message": "Upload confirmado com sucesso",
             "documentId": req.documentId,
             "status": req.status
-        }
+        })
         
     except HTTPException:
         raise
@@ -277,25 +329,36 @@ async def notify_upload(req: NotifyUploadRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/documents")
-async def list_documents():
+async def list_documents(
+    offset: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+):
     """
-    Lista todos os documentos
+    Lista os documentos (mais recentes primeiro)
+    Aceita paginação opcional via offset/limit; sem limit retorna todos
     """
     try:
         metadata = load_metadata()
         
-        documents = [
-            DocumentMetadata(**doc) 
-            for doc in metadata.values()
-            if doc.get("status") == "uploaded"
-        ]
+        with span("filter_sort"):
+            records = [
+                record
+                for record in metadata.values()
+                if record.status == STATUS_UPLOADED
+            ]
+            
+            # Ordenar por data de upload (mais recente primeiro) usando o timestamp inteiro
+            records.sort(key=lambda r: r.uploaded_at, reverse=True)
         
-        # Ordenar por data de upload (mais recente primeiro)
-        documents.sort(key=lambda x: x.uploadedAt, reverse=True)
+        total = len(records)
+        page = records[offset:] if limit is None else records[offset:offset + limit]
         
-        logger.info(f"Listando documentos: count={len(documents)}")
+        logger.info(f"Listando documentos: count={len(page)}, offset={offset}, total={total}")
         
-        return {"documents": documents}
+        # Construção dos modelos e codificação JSON somam no mesmo span "serialize"
+        with span("serialize"):
+            documents = [DocumentMetadata(**record.to_dict()) for record in page]
+        return json_response({"documents": documents, "total": total, "offset": offset})
         
     except Exception as e:
         logger.exception("Erro ao listar documentos")
@@ -316,26 +379,27 @@ async def get_download_url(document_id: str):
         
         # Encoding do filename para suportar caracteres não-ASCII
         # RFC 5987: filename*=UTF-8''encoded-filename
-        encoded_filename = quote(doc["originalFilename"])
+        encoded_filename = quote(doc.original_filename)
         
         # Gerar URL pré-assinada para download
-        presigned_url = s3_client.generate_presigned_url(
-            ClientMethod="get_object",
-            Params={
-                "Bucket": BUCKET,
-                "Key": doc["s3Key"],
-                # Usa formato RFC 5987 para suportar caracteres especiais
-                "ResponseContentDisposition": f"attachment; filename*=UTF-8''{encoded_filename}"
-            },
-            ExpiresIn=PRESIGN_DOWNLOAD_EXPIRES,
-        )
+        with span("presign"):
+            presigned_url = s3_client.generate_presigned_url(
+                ClientMethod="get_object",
+                Params={
+                    "Bucket": BUCKET,
+                    "Key": doc.s3_key,
+                    # Usa formato RFC 5987 para suportar caracteres especiais
+                    "ResponseContentDisposition": f"attachment; filename*=UTF-8''{encoded_filename}"
+                },
+                ExpiresIn=PRESIGN_DOWNLOAD_EXPIRES,
+            )
         
         logger.info(f"URL pré-assinada gerada para download: documentId={document_id}")
         
-        return PresignDownloadResponse(
+        return json_response(PresignDownloadResponse(
             downloadUrl=presigned_url,
             expires=PRESIGN_DOWNLOAD_EXPIRES
-        )
+        ))
         
     except ClientError as e:
         logger.exception("Erro ao gerar URL de download")
@@ -349,6 +413,73 @@ async def get_download_url(document_id: str):
         logger.exception("Erro inesperado")
         raise HTTPException(status_code=500, detail=str(e))
 
+def open_s3_object(key: str):
+    """Cria a função que abre um objeto S3 em streaming para o ZIP"""
+    def open_object():
+        response = s3_client.get_object(Bucket=BUCKET, Key=key)
+        # O StreamingBody é fechado pelo zip_stream ao terminar, cancelar ou falhar
+        return response["ContentLength"], response["Body"]
+    return open_object
+
+@app.post("/api/documents/archive")
+async def download_archive(req: ArchiveRequest):
+    """
+    Gera um ZIP com vários documentos, enviado em streaming enquanto é montado
+    Os objetos são baixados do S3 em paralelo (janela de prefetch limitada)
+    """
+    # Remove IDs duplicados mantendo a ordem
+    document_ids = list(dict.fromkeys(req.documentIds))
+    
+    if not document_ids:
+        raise HTTPException(status_code=400, detail="Nenhum documento informado")
+    if len(document_ids) > ARCHIVE_MAX_DOCUMENTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Máximo de {ARCHIVE_MAX_DOCUMENTS} documentos por arquivo"
+        )
+    
+    metadata = load_metadata()
+    
+    missing = [
+        document_id for document_id in document_ids
+        if document_id not in metadata or metadata[document_id].status != STATUS_UPLOADED
+    ]
+    if missing:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Documentos não encontrados: {', '.join(missing)}"
+        )
+    
+    records = [metadata[document_id] for document_id in document_ids]
+    del metadata
+    
+    names = unique_names(record.original_filename for record in records)
+    entries = [
+        ZipEntry(
+            name=name,
+            opener=open_s3_object(record.s3_key),
+            modified=record.uploaded_at_datetime,
+        )
+        for name, record in zip(names, records)
+    ]
+    
+    logger.info(f"Gerando ZIP: documentos={len(entries)}")
+    
+    def stream():
+        try:
+            yield from iter_zip(entries, window=ARCHIVE_PREFETCH_WINDOW, chunk_size=ARCHIVE_CHUNK_SIZE)
+            logger.info(f"ZIP concluído: documentos={len(entries)}")
+        except Exception:
+            # Os headers já foram enviados; só resta interromper o stream
+            logger.exception("Erro ao gerar ZIP")
+            raise
+    
+    return StreamingResponse(
+        stream(),
+        media_type="application/zip",
+        headers={"Content-Disposition": 'attachment; filename="documentos.zip"'}
+    )
+
 @app.delete("/api/documents/{document_id}")
 async def delete_document(document_id: str):
     """
@@ -364,8 +495,9 @@ async def delete_document(document_id: str):
         
         # Deletar do S3
         try:
-            s3_client.delete_object(Bucket=BUCKET, Key=doc["s3Key"])
-            logger.info(f"Arquivo deletado do S3: {doc['s3Key']}")
+            with span("s3_delete_object"):
+                s3_client.delete_object(Bucket=BUCKET, Key=doc.s3_key)
+            logger.info(f"Arquivo deletado do S3: {doc.s3_key}")
         except ClientError as e:
             logger.warning(f"Erro ao deletar do S3 (continuando): {e}")
         
@@ -375,10 +507,10 @@ async def delete_document(document_id: str):
         
         logger.info(f"Documento deletado: documentId={document_id}")
         
-        return {
+        return json_response({
             "message": "Documento deletado com sucesso",
             "documentId": document_id
-        }
+        })
         
     except HTTPException:
         raise
@@ -386,6 +518,33 @@ async def delete_document(document_id: str):
         logger.exception("Erro ao deletar documento")
         raise HTTPException(status_code=500, detail=str(e))
 
+# Apenas um profiling por worker de cada vez
+_profile_lock = threading.Lock()
+
+@app.get("/debug/profile", response_class=PlainTextResponse)
+def debug_profile(
+    seconds: float = Query(5, gt=0, le=60),
+    x_profile_token: Optional[str] = Header(None),
+):
+    """
+    Executa um profiler por amostragem neste worker durante N segundos
+    Retorna as pilhas no formato folded (compatível com flamegraph.pl/speedscope)
+    """
+    # Endpoint só existe quando PROFILER_TOKEN está configurado
+    # compare_digest só aceita str ASCII; bytes funcionam com qualquer header
+    if not PROFILER_TOKEN or not secrets.compare_digest(
+        (x_profile_token or "").encode(), PROFILER_TOKEN.encode()
+    ):
+        raise HTTPException(status_code=404, detail="Not Found")
+    
+    if not _profile_lock.acquire(blocking=False):
+        raise HTTPException(status_code=409, detail="Profiling já em execução")
+    try:
+        logger.info(f"Profiler iniciado: seconds={seconds}")
+        return sample_stacks(seconds)
+    finally:
+        _profile_lock.release()
+
 # Servir arquivos estáticos (frontend)
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
@@ -0,0 +1,106 @@
+# Benchmark de memória e tempo: dicts de metadados vs registros compactos (DocumentRecord)
+import argparse
+import gc
+import json
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from pathlib import Path
+from uuid import uuid4
+
+from document_store import build_s3_key, dump_records, load_records
+
+STATUSES = ("pending", "uploaded", "error")
+
+
+def make_dicts(count: int):
+    """Gera metadados no formato atual (um dict por documento)"""
+    base = datetime(2024, 1, 1)
+    data = {}
+    for i in range(count):
+        document_id = str(uuid4())
+        original_filename = f"relatorio-{i}.pdf"
+        s3_key = build_s3_key(document_id, original_filename)
+        data[document_id] = {
+            "documentId": document_id,
+            "filename": s3_key.split("/", 1)[1],
+            "originalFilename": original_filename,
+            "contentType": "application/pdf",
+            "s3Key": s3_key,
+            "uploadedAt": (base + timedelta(seconds=i, microseconds=i)).isoformat(),
+            "status": STATUSES[i % 3],
+            "sizeBytes": 1024 * (i % 5000),
+        }
+    return data
+
+
+def timed(func) -> float:
+    """Tempo de parede de func() sem tracemalloc (que deixa a execução várias vezes mais lenta)"""
+    gc.collect()
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def measure(label: str, build):
+    """Mede o tempo de build() e, em uma segunda execução, a memória alocada via tracemalloc"""
+    elapsed = timed(build)
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"  {label:<24} atual={current / 2**20:9.1f} MiB  pico={peak / 2**20:9.1f} MiB  carga={elapsed:6.2f}s")
+    return result, current
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de memória e tempo dos metadados")
+    parser.add_argument("-n", "--count", type=int, default=200_000, help="Número de documentos")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print(f"BENCHMARK DE MEMÓRIA E TEMPO ({args.count} documentos)")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "documents_metadata.json"
+        with open(path, 'w') as f:
+            json.dump(make_dicts(args.count), f, indent=2)
+        print(f"  Arquivo JSON: {path.stat().st_size / 2**20:.1f} MiB\n")
+
+        def build_dicts():
+            with open(path, 'r') as f:
+                return json.load(f)
+
+        dicts, dicts_bytes = measure("dict (json.load)", build_dicts)
+        records, records_bytes = measure("DocumentRecord", lambda: load_records(path))
+
+        # Cada requisição de escrita do app regrava o arquivo inteiro
+        out_path = Path(tmp) / "out.json"
+
+        def save_dicts():
+            with open(out_path, 'w') as f:
+                json.dump(dicts, f, indent=2)
+
+        dicts_save = timed(save_dicts)
+        records_save = timed(lambda: dump_records(records, out_path))
+        print(f"  {'dict (json.dump)':<24} gravação={dicts_save:6.2f}s")
+        print(f"  {'DocumentRecord':<24} gravação={records_save:6.2f}s")
+
+    # Ordenação: string ISO vs timestamp inteiro
+    start = time.perf_counter()
+    sorted(dicts.values(), key=lambda d: d["uploadedAt"], reverse=True)
+    iso_sort = time.perf_counter() - start
+    start = time.perf_counter()
+    sorted(records.values(), key=lambda r: r.uploaded_at, reverse=True)
+    int_sort = time.perf_counter() - start
+
+    print(f"\n  Redução de memória: {100 * (1 - records_bytes / dicts_bytes):.1f}%")
+    print(f"  Bytes por documento: dict={dicts_bytes / args.count:.0f}  record={records_bytes / args.count:.0f}")
+    print(f"  Ordenação: ISO={iso_sort * 1000:.1f} ms  inteiro={int_sort * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
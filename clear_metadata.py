@@ -1,56 +1,393 @@
-# Script para limpar metadados locais
+# Ferramenta de administração dos metadados locais
+#
+# Uso:
+#   python clear_metadata.py                      # limpa todos os metadados (com confirmação)
+#   python clear_metadata.py stats                # resumo: contagens, bytes, histograma de status
+#   python clear_metadata.py export -o docs.ndjson
+#   python clear_metadata.py import docs.ndjson
+#   python clear_metadata.py purge --status error --older-than 30
+#   python clear_metadata.py compact --pending-hours 24 --dry-run
+#
+# Todas as operações processam um documento por vez (streaming), com memória
+# constante mesmo em arquivos com milhões de registros. Entradas que não são
+# objetos JSON são contadas e mantidas sem alteração (não são exportadas).
+# Os arquivos no S3 NÃO são afetados.
+import argparse
 import json
+import sys
+from collections import Counter
 from pathlib import Path
 
+from document_store import (
+    DocumentRecord,
+    STATUS_PENDING,
+    iso_to_epoch_us,
+    iter_entries,
+    replace_entries,
+    utcnow_epoch_us,
+)
+
 METADATA_FILE = Path("data/documents_metadata.json")
 
-def clear_metadata():
-    """Limpa todos os metadados armazenados localmente"""
+_US_PER_HOUR = 3600 * 1_000_000
+_US_PER_DAY = 24 * _US_PER_HOUR
+
+
+def print_header(title: str):
     print("=" * 60)
-    print("LIMPEZA DE METADADOS")
+    print(title)
     print("=" * 60)
-    
+
+
+def confirm(message: str, assume_yes: bool = False) -> bool:
+    """Pede confirmação digitando 'SIM'"""
+    if assume_yes:
+        return True
+    response = input(f"\n⚠️  ATENÇÃO: {message}\n   Os arquivos no S3 NÃO serão afetados.\n   \n   Deseja continuar? (digite 'SIM' para confirmar): ")
+    return response.strip().upper() == 'SIM'
+
+
+def age_us(doc: dict, now_us: int):
+    """Idade do documento em microssegundos (None se uploadedAt for inválido)"""
+    try:
+        return now_us - iso_to_epoch_us(doc["uploadedAt"])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def compute_stats(path: Path) -> dict:
+    """Calcula o resumo dos metadados em uma única passada"""
+    statuses = Counter()
+    total_bytes = 0
+    unrecognized = 0
+    oldest = newest = None
+
+    for _, doc in iter_entries(path):
+        if not isinstance(doc, dict):
+            unrecognized += 1
+            continue
+        status = doc.get("status", "N/A")
+        statuses[status if isinstance(status, str) else "N/A"] += 1
+        size_bytes = doc.get("sizeBytes")
+        if isinstance(size_bytes, int) and not isinstance(size_bytes, bool):
+            total_bytes += size_bytes
+        # Datas inválidas não entram no intervalo (comparação pelo instante, não pelo texto)
+        try:
+            uploaded_at = (iso_to_epoch_us(doc["uploadedAt"]), doc["uploadedAt"])
+        except (KeyError, TypeError, ValueError):
+            continue
+        oldest = uploaded_at if oldest is None else min(oldest, uploaded_at)
+        newest = uploaded_at if newest is None else max(newest, uploaded_at)
+
+    return {
+        "total": sum(statuses.values()),
+        "totalBytes": total_bytes,
+        "statuses": dict(statuses.most_common()),
+        "unrecognized": unrecognized,
+        "oldest": oldest and oldest[1],
+        "newest": newest and newest[1],
+    }
+
+
+def print_stats(stats: dict):
+    print(f"\nMetadados atuais:")
+    print(f"  Total de documentos: {stats['total']}")
+    print(f"  Total de bytes: {stats['totalBytes']} ({stats['totalBytes'] / 2**20:.1f} MiB)")
+    if stats["total"]:
+        print(f"  Upload mais antigo: {stats['oldest']}")
+        print(f"  Upload mais recente: {stats['newest']}")
+        print("  Status:")
+        for status, count in stats["statuses"].items():
+            print(f"    - {status}: {count}")
+    if stats["unrecognized"]:
+        print(f"  Entradas não reconhecidas (não são objetos): {stats['unrecognized']}")
+
+
+def clear_metadata(args=None):
+    """Limpa todos os metadados armazenados localmente"""
+    assume_yes = bool(args and args.yes)
+    print_header("LIMPEZA DE METADADOS")
+
     if not METADATA_FILE.exists():
         print("\n✓ Arquivo de metadados não existe. Nada para limpar.")
         return
-    
-    # Ler metadados atuais
-    with open(METADATA_FILE, 'r') as f:
-        data = json.load(f)
-    
-    # Contar documentos
-    total_docs = len(data)
-    
-    print(f"\nMetadados atuais:")
-    print(f"  Total de documentos: {total_docs}")
-    
-    if total_docs == 0:
+
+    stats = compute_stats(METADATA_FILE)
+    print_stats(stats)
+
+    if stats["total"] == 0 and not stats["unrecognized"]:
         print("\n✓ Não há metadados para limpar.")
         return
-    
-    # Mostrar detalhes
-    print("\nDetalhes:")
-    for doc_id, doc in data.items():
-        print(f"  - {doc.get('originalFilename', 'N/A')} ({doc.get('sizeBytes', 0)} bytes)")
-        print(f"    ID: {doc_id}")
-    
+
     # Confirmar limpeza
     print("\n" + "=" * 60)
-    response = input("\n⚠️  ATENÇÃO: Esta ação irá DELETAR todos os metadados locais!\n   Os arquivos no S3 NÃO serão afetados.\n   \n   Deseja continuar? (digite 'SIM' para confirmar): ")
-    
-    if response.strip().upper() != 'SIM':
+    if not confirm("Esta ação irá DELETAR todos os metadados locais!", assume_yes):
         print("\n✓ Operação cancelada. Nenhum dado foi modificado.")
         return
-    
+
     # Limpar metadados
-    with open(METADATA_FILE, 'w') as f:
-        json.dump({}, f, indent=2)
-    
+    replace_entries(METADATA_FILE, [])
+
     print("\n✓ Metadados limpos com sucesso!")
     print("\nPróximos passos:")
     print("  - Os metadados foram resetados para um objeto vazio {}")
     print("  - Os arquivos ainda estão no S3 (não foram deletados)")
     print("  - Para deletar arquivos do S3, use o Console AWS ou a interface da aplicação")
 
+
+def stats_command(args):
+    """Mostra o resumo dos metadados sem listar os documentos"""
+    stats = compute_stats(METADATA_FILE)
+    if args.json:
+        print(json.dumps(stats, indent=2))
+    else:
+        print_header("ESTATÍSTICAS DE METADADOS")
+        print_stats(stats)
+
+
+def export_command(args):
+    """Exporta os metadados como NDJSON (um documento por linha)"""
+    out = sys.stdout if args.output == "-" else open(args.output, 'w')
+    count = 0
+    skipped = []
+    try:
+        for doc_id, doc in iter_entries(METADATA_FILE):
+            # O import só aceita objetos; outras entradas não são exportadas
+            if not isinstance(doc, dict):
+                skipped.append(doc_id)
+                continue
+            out.write(json.dumps(doc, ensure_ascii=False))
+            out.write("\n")
+            count += 1
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print(f"✓ {count} documentos exportados", file=sys.stderr)
+    if skipped:
+        print(
+            f"⚠ {len(skipped)} entradas não reconhecidas não exportadas: {', '.join(map(repr, skipped[:10]))}",
+            file=sys.stderr,
+        )
+
+
+def _parse_import_line(line: str) -> DocumentRecord:
+    """
+    Valida uma linha do NDJSON; levanta ValueError se o app não puder usá-la
+    (DocumentRecord.from_dict verifica uploadedAt, sizeBytes, status e contentType)
+    """
+    try:
+        doc = json.loads(line)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"JSON inválido ({e})")
+    if not isinstance(doc, dict):
+        raise ValueError("não é um objeto JSON")
+    for field in ("documentId", "originalFilename", "uploadedAt"):
+        if not doc.get(field):
+            raise ValueError(f"campo '{field}' ausente")
+    if not isinstance(doc["documentId"], str) or not isinstance(doc["originalFilename"], str):
+        raise ValueError("documentId e originalFilename devem ser texto")
+    return DocumentRecord.from_dict(doc)
+
+
+def _read_ndjson(source, skip_invalid: bool, skipped: list):
+    """Itera os documentos do NDJSON já normalizados no formato do app"""
+    for line_number, line in enumerate(source, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = _parse_import_line(line)
+        except ValueError as e:
+            if not skip_invalid:
+                raise ValueError(f"Linha {line_number}: {e}")
+            skipped.append(f"Linha {line_number}: {e}")
+            continue
+        yield record.document_id, record.to_dict()
+
+
+def import_command(args):
+    """Substitui os metadados pelo conteúdo de um arquivo NDJSON"""
+    if METADATA_FILE.exists() and not confirm(
+        "Esta ação irá SUBSTITUIR todos os metadados locais pelo arquivo importado!",
+        args.yes,
+    ):
+        print("\n✓ Operação cancelada. Nenhum dado foi modificado.")
+        return
+
+    skipped = []
+    source = sys.stdin if args.input == "-" else open(args.input, 'r')
+    try:
+        METADATA_FILE.parent.mkdir(exist_ok=True)
+        # replace_entries só substitui o arquivo se todas as linhas forem gravadas
+        count = replace_entries(METADATA_FILE, _read_ndjson(source, args.skip_invalid, skipped))
+    except ValueError as e:
+        print(f"\n❌ Importação cancelada: {e}")
+        print("   Nenhum dado foi modificado (use --skip-invalid para ignorar linhas inválidas).")
+        sys.exit(1)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+    print(f"✓ {count} documentos importados")
+    if skipped:
+        print(f"⚠ {len(skipped)} linhas inválidas ignoradas:")
+        for message in skipped[:20]:
+            print(f"  - {message}")
+        if len(skipped) > 20:
+            print(f"  ... e mais {len(skipped) - 20}")
+
+
+def _filter_entries(predicate, removed: Counter, unrecognized: list):
+    """Itera os documentos mantidos, contando os removidos por status"""
+    for doc_id, doc in iter_entries(METADATA_FILE):
+        if not isinstance(doc, dict):
+            # Mantida sem alteração: não há como saber status ou idade
+            unrecognized.append(doc_id)
+        elif predicate(doc):
+            status = doc.get("status", "N/A")
+            removed[status if isinstance(status, str) else "N/A"] += 1
+            continue
+        yield doc_id, doc
+
+
+def purge_command(args):
+    """Remove documentos filtrando por status e/ou idade"""
+    if not args.status and args.older_than is None:
+        print("❌ Informe ao menos --status ou --older-than")
+        sys.exit(2)
+
+    now_us = utcnow_epoch_us()
+    statuses = set(args.status or [])
+    max_age_us = None if args.older_than is None else args.older_than * _US_PER_DAY
+
+    def matches(doc: dict) -> bool:
+        if statuses and not (isinstance(doc.get("status"), str) and doc["status"] in statuses):
+            return False
+        if max_age_us is not None:
+            age = age_us(doc, now_us)
+            if age is None or age < max_age_us:
+                return False
+        return True
+
+    print_header("PURGA DE METADADOS")
+    removed = Counter()
+    unrecognized = []
+    if args.dry_run:
+        kept = sum(1 for _ in _filter_entries(matches, removed, unrecognized))
+        print(f"\n(simulação) {sum(removed.values())} documentos seriam removidos, {kept} mantidos")
+    else:
+        if not confirm("Esta ação irá DELETAR os metadados que atendem aos filtros!", args.yes):
+            print("\n✓ Operação cancelada. Nenhum dado foi modificado.")
+            return
+        kept = replace_entries(METADATA_FILE, _filter_entries(matches, removed, unrecognized))
+        print(f"\n✓ {sum(removed.values())} documentos removidos, {kept} mantidos")
+    for status, count in removed.most_common():
+        print(f"  - {status}: {count}")
+    if unrecognized:
+        print(f"⚠ {len(unrecognized)} entradas não reconhecidas mantidas sem alteração: {', '.join(map(repr, unrecognized[:10]))}")
+
+
+def compact_command(args):
+    """
+    Compacta os metadados: remove uploads pendentes abandonados e normaliza os
+    campos derivados (filename, s3Key, uploadedAt). Entradas que não podem ser
+    convertidas em registro sem inventar valores (por exemplo, uploadedAt
+    ausente ou inválido) são mantidas sem alteração e nunca removidas por idade.
+    """
+    now_us = utcnow_epoch_us()
+    max_pending_us = args.pending_hours * _US_PER_HOUR
+    removed = Counter()
+    unreadable = []
+
+    def compacted():
+        for doc_id, doc in iter_entries(METADATA_FILE):
+            try:
+                if not isinstance(doc, dict):
+                    raise ValueError("não é um objeto")
+                record = DocumentRecord.from_dict(doc, doc_id)
+            except ValueError:
+                unreadable.append(doc_id)
+                yield doc_id, doc
+                continue
+            if record.status == STATUS_PENDING and now_us - record.uploaded_at >= max_pending_us:
+                removed["pending abandonado"] += 1
+                continue
+            yield record.document_id, record.to_dict()
+
+    print_header("COMPACTAÇÃO DE METADADOS")
+    if args.dry_run:
+        kept = sum(1 for _ in compacted())
+        print(f"\n(simulação) {sum(removed.values())} documentos seriam removidos, {kept} mantidos")
+    else:
+        if not confirm(
+            f"Esta ação irá DELETAR uploads pendentes há mais de {args.pending_hours:g}h e reescrever os metadados!",
+            args.yes,
+        ):
+            print("\n✓ Operação cancelada. Nenhum dado foi modificado.")
+            return
+        size_before = METADATA_FILE.stat().st_size
+        kept = replace_entries(METADATA_FILE, compacted())
+        size_after = METADATA_FILE.stat().st_size
+        print(f"\n✓ {kept} documentos mantidos, {sum(removed.values())} removidos")
+        print(f"  Tamanho do arquivo: {size_before} → {size_after} bytes")
+
+    for reason, count in removed.most_common():
+        print(f"  - {reason}: {count}")
+    if unreadable:
+        print(f"⚠ {len(unreadable)} entradas não reconhecidas mantidas sem alteração: {', '.join(map(repr, unreadable[:10]))}")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Administração dos metadados locais de documentos")
+    parser.add_argument("--file", type=Path, default=METADATA_FILE, help="Arquivo de metadados")
+    subparsers = parser.add_subparsers(dest="command")
+
+    clear = subparsers.add_parser("clear", help="Remove todos os metadados")
+    clear.add_argument("-y", "--yes", action="store_true", help="Não pedir confirmação")
+    clear.set_defaults(func=clear_metadata)
+
+    stats = subparsers.add_parser("stats", help="Resumo: contagens, bytes e status")
+    stats.add_argument("--json", action="store_true", help="Saída em JSON")
+    stats.set_defaults(func=stats_command)
+
+    export = subparsers.add_parser("export", help="Exporta como NDJSON")
+    export.add_argument("-o", "--output", default="-", help="Arquivo de saída ('-' para stdout)")
+    export.set_defaults(func=export_command)
+
+    import_ = subparsers.add_parser("import", help="Substitui os metadados por um NDJSON")
+    import_.add_argument("input", help="Arquivo NDJSON ('-' para stdin)")
+    import_.add_argument("-y", "--yes", action="store_true", help="Não pedir confirmação")
+    import_.add_argument("--skip-invalid", action="store_true", help="Ignora linhas inválidas em vez de cancelar")
+    import_.set_defaults(func=import_command)
+
+    purge = subparsers.add_parser("purge", help="Remove documentos por status e/ou idade")
+    purge.add_argument("--status", action="append", help="Status a remover (pode repetir)")
+    purge.add_argument("--older-than", type=float, metavar="DIAS", help="Idade mínima em dias")
+    purge.add_argument("--dry-run", action="store_true", help="Apenas mostra o que seria removido")
+    purge.add_argument("-y", "--yes", action="store_true", help="Não pedir confirmação")
+    purge.set_defaults(func=purge_command)
+
+    compact = subparsers.add_parser("compact", help="Remove pendentes abandonados e normaliza registros")
+    compact.add_argument("--pending-hours", type=float, default=24, help="Idade mínima de um pendente abandonado (horas)")
+    compact.add_argument("--dry-run", action="store_true", help="Apenas mostra o que seria removido")
+    compact.add_argument("-y", "--yes", action="store_true", help="Não pedir confirmação")
+    compact.set_defaults(func=compact_command)
+
+    return parser
+
+
+def main(argv=None):
+    global METADATA_FILE
+    args = build_parser().parse_args(argv)
+    METADATA_FILE = args.file
+
+    if args.command is None:
+        clear_metadata()
+        return
+    if args.command not in ("clear", "import") and not METADATA_FILE.exists():
+        print("✓ Arquivo de metadados não existe.")
+        return
+    args.func(args)
+
+
 if __name__ == "__main__":
-    clear_metadata()
+    main()
@@ -0,0 +1,340 @@
+# document_store.py
+"""
+Representação compacta dos metadados de documentos em memória.
+
+Cada documento é mantido como um `DocumentRecord` com `__slots__` em vez de
+um dict de oito chaves. Campos derivados (`filename` e `s3Key`) são
+calculados sob demanda a partir de `documentId` e `originalFilename`, o
+status é internado e `uploadedAt` é guardado como inteiro (microssegundos
+desde a época Unix, UTC), o que também permite ordenar sem reprocessar
+strings ISO.
+
+O formato em disco continua sendo o JSON atual (`DocumentMetadata`). Entradas
+que não podem ser convertidas em registro são preservadas sem alteração e
+gravadas de volta como estavam.
+"""
+import json
+import logging
+import os
+import re
+import sys
+from datetime import datetime, timedelta, timezone
+from itertools import chain
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+S3_PREFIX = "documents/"
+
+# Status conhecidos (internados para que registros compartilhem a mesma string)
+STATUS_PENDING = sys.intern("pending")
+STATUS_UPLOADED = sys.intern("uploaded")
+STATUS_ERROR = sys.intern("error")
+_KNOWN_STATUSES = {status: status for status in (STATUS_PENDING, STATUS_UPLOADED, STATUS_ERROR)}
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+# Resto do buffer que ainda pode fazer parte de um número ("1e" de "1e5", "1." de "1.5")
+_NUMBER_TAIL = re.compile(r"[0-9.eE+\-]*\Z")
+
+logger = logging.getLogger("pdf-manager-api.document_store")
+
+
+def intern_status(status: str) -> str:
+    """Retorna a instância compartilhada de um status conhecido (outros valores não são internados)"""
+    return _KNOWN_STATUSES.get(status, status)
+
+
+def iso_to_epoch_us(value: str) -> int:
+    """Converte uma data ISO 8601 (UTC) em microssegundos desde a época"""
+    dt = datetime.fromisoformat(value)
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return (dt - _EPOCH) // _MICROSECOND
+
+
+def epoch_us_to_iso(value: int) -> str:
+    """Converte microssegundos desde a época no mesmo formato de `datetime.utcnow().isoformat()`"""
+    return (_EPOCH + timedelta(microseconds=value)).isoformat()
+
+
+def utcnow_epoch_us() -> int:
+    """Instante atual em microssegundos desde a época (UTC)"""
+    return (datetime.utcnow() - _EPOCH) // _MICROSECOND
+
+
+def build_s3_key(document_id: str, original_filename: str) -> str:
+    """Chave S3 padrão de um documento"""
+    return f"{S3_PREFIX}{document_id}_{original_filename}"
+
+
+class DocumentRecord:
+    """Registro compacto de um documento"""
+
+    __slots__ = (
+        "document_id",
+        "original_filename",
+        "content_type",
+        "size_bytes",
+        "uploaded_at",
+        "status",
+        "_s3_key",
+    )
+
+    def __init__(
+        self,
+        document_id: str,
+        original_filename: str,
+        content_type: str = "application/pdf",
+        size_bytes: Optional[int] = None,
+        uploaded_at: Optional[int] = None,
+        status: str = STATUS_PENDING,
+        s3_key: Optional[str] = None,
+    ):
+        self.document_id = document_id
+        self.original_filename = original_filename
+        self.content_type = sys.intern(content_type)
+        self.size_bytes = size_bytes
+        self.uploaded_at = utcnow_epoch_us() if uploaded_at is None else uploaded_at
+        self.status = intern_status(status)
+        # Só guarda a chave quando ela não segue o padrão (registros antigos)
+        if s3_key is not None and s3_key == build_s3_key(document_id, original_filename):
+            s3_key = None
+        self._s3_key = s3_key
+
+    @property
+    def s3_key(self) -> str:
+        if self._s3_key is not None:
+            return self._s3_key
+        return build_s3_key(self.document_id, self.original_filename)
+
+    @property
+    def filename(self) -> str:
+        if self._s3_key is not None and self._s3_key.startswith(S3_PREFIX):
+            return self._s3_key[len(S3_PREFIX):]
+        if self._s3_key is not None:
+            return self._s3_key
+        return f"{self.document_id}_{self.original_filename}"
+
+    @property
+    def uploaded_at_datetime(self) -> datetime:
+        return _EPOCH + timedelta(microseconds=self.uploaded_at)
+
+    @property
+    def uploaded_at_iso(self) -> str:
+        return epoch_us_to_iso(self.uploaded_at)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], document_id: Optional[str] = None) -> "DocumentRecord":
+        """
+        Cria um registro a partir do formato JSON `DocumentMetadata`
+
+        Campos derivados podem faltar: `documentId` pode vir da chave do
+        arquivo e `originalFilename` é deduzido de `filename`/`s3Key`.
+        Levanta ValueError se um valor precisaria ser inventado (documento sem
+        id ou `uploadedAt` inválido) ou tiver o tipo errado.
+        """
+        data_id = data.get("documentId")
+        if not data_id or data_id == document_id:
+            # Reaproveita a string da chave do arquivo em vez de manter uma cópia
+            data_id = document_id
+        document_id = data_id
+        if not isinstance(document_id, str) or not document_id:
+            raise ValueError("documento sem 'documentId'")
+
+        s3_key = data.get("s3Key") if isinstance(data.get("s3Key"), str) else None
+        original_filename = data.get("originalFilename")
+        if not isinstance(original_filename, str) or not original_filename:
+            filename = data.get("filename") or (s3_key or "").rsplit("/", 1)[-1]
+            prefix = f"{document_id}_"
+            if isinstance(filename, str) and filename.startswith(prefix):
+                filename = filename[len(prefix):]
+            original_filename = filename if isinstance(filename, str) and filename else document_id
+
+        try:
+            uploaded_at = iso_to_epoch_us(data["uploadedAt"])
+        except (KeyError, TypeError, ValueError):
+            raise ValueError(f"uploadedAt inválido: {data.get('uploadedAt')!r}")
+
+        size_bytes = data.get("sizeBytes")
+        if size_bytes is not None and (not isinstance(size_bytes, int) or isinstance(size_bytes, bool)):
+            raise ValueError(f"sizeBytes inválido: {size_bytes!r}")
+        content_type = data.get("contentType", "application/pdf")
+        if not isinstance(content_type, str):
+            raise ValueError(f"contentType inválido: {content_type!r}")
+        status = data.get("status", STATUS_PENDING)
+        if not isinstance(status, str):
+            raise ValueError(f"status inválido: {status!r}")
+
+        return cls(
+            document_id=document_id,
+            original_filename=original_filename,
+            content_type=content_type,
+            size_bytes=size_bytes,
+            uploaded_at=uploaded_at,
+            status=status,
+            s3_key=s3_key,
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serializa no formato JSON `DocumentMetadata`"""
+        return {
+            "documentId": self.document_id,
+            "filename": self.filename,
+            "originalFilename": self.original_filename,
+            "contentType": self.content_type,
+            "s3Key": self.s3_key,
+            "uploadedAt": self.uploaded_at_iso,
+            "status": self.status,
+            "sizeBytes": self.size_bytes,
+        }
+
+    def __repr__(self) -> str:
+        return f"DocumentRecord(document_id={self.document_id!r}, status={self.status!r})"
+
+
+class DocumentRecords(dict):
+    """
+    Registros indexados por documentId
+
+    `unrecognized` guarda as entradas do arquivo que não puderam ser convertidas
+    em registro, exatamente como foram lidas, para que `dump_records` as grave
+    de volta sem alteração.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.unrecognized: Dict[str, Any] = {}
+
+
+def load_records(path: Path) -> DocumentRecords:
+    """
+    Carrega o arquivo de metadados como registros compactos
+
+    Cada documento é convertido assim que é lido, sem manter todos os dicts
+    intermediários em memória. Entradas que não são objetos JSON válidos como
+    `DocumentMetadata` ficam em `unrecognized`; erros de sintaxe no arquivo
+    são propagados.
+    """
+    records = DocumentRecords()
+    for doc_id, doc in iter_entries(path):
+        try:
+            if not isinstance(doc, dict):
+                raise ValueError("não é um objeto")
+            records[doc_id] = DocumentRecord.from_dict(doc, doc_id)
+        except ValueError as e:
+            logger.debug(f"Entrada não reconhecida em {path}: {doc_id!r} ({e})")
+            records.unrecognized[doc_id] = doc
+    if records.unrecognized:
+        logger.warning(
+            f"{len(records.unrecognized)} entradas não reconhecidas em {path} "
+            f"serão mantidas sem alteração: {', '.join(map(repr, list(records.unrecognized)[:10]))}"
+        )
+    return records
+
+
+def dump_records(records: Dict[str, DocumentRecord], path: Path):
+    """
+    Salva registros compactos no formato JSON atual (um documento por vez),
+    seguidos das entradas não reconhecidas de `DocumentRecords.unrecognized`
+    """
+    unrecognized = getattr(records, "unrecognized", {})
+    entries = ((doc_id, record.to_dict()) for doc_id, record in records.items())
+    kept = ((doc_id, doc) for doc_id, doc in unrecognized.items() if doc_id not in records)
+    write_entries(path, chain(entries, kept))
+
+
+def write_entries(path: Path, entries: Iterable[Tuple[str, Any]]) -> int:
+    """Escreve pares (documentId, dict) no formato do arquivo de metadados, sem montar o objeto inteiro"""
+    count = 0
+    with open(path, 'w') as f:
+        f.write("{")
+        for doc_id, doc in entries:
+            body = json.dumps(doc, indent=2).replace("\n", "\n  ")
+            f.write(",\n" if count else "\n")
+            f.write(f"  {json.dumps(doc_id)}: {body}")
+            count += 1
+        f.write("\n}" if count else "}")
+    return count
+
+
+def replace_entries(path: Path, entries: Iterable[Tuple[str, Any]]) -> int:
+    """Reescreve o arquivo de metadados de forma atômica (arquivo temporário + rename)"""
+    tmp_path = path.with_name(path.name + ".tmp")
+    try:
+        count = write_entries(tmp_path, entries)
+        os.replace(tmp_path, path)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+    return count
+
+
+def iter_entries(path: Path, chunk_size: int = 1 << 16) -> Iterator[Tuple[str, Any]]:
+    """
+    Itera os pares (documentId, dict) do arquivo de metadados em streaming,
+    mantendo em memória apenas o documento atual e um buffer de leitura
+    """
+    decoder = json.JSONDecoder()
+    with open(path, 'r') as f:
+        buffer = ""
+        pos = 0
+        eof = False
+
+        def fill() -> bool:
+            # Descarta o que já foi consumido e lê mais um bloco
+            nonlocal buffer, pos, eof
+            if eof:
+                return False
+            chunk = f.read(chunk_size)
+            if not chunk:
+                eof = True
+                return False
+            buffer = buffer[pos:] + chunk
+            pos = 0
+            return True
+
+        def next_char() -> str:
+            # Pula espaços e retorna o próximo caractere sem consumi-lo
+            nonlocal pos
+            while True:
+                while pos < len(buffer) and buffer[pos].isspace():
+                    pos += 1
+                if pos < len(buffer):
+                    return buffer[pos]
+                if not fill():
+                    return ""
+
+        def decode() -> Any:
+            nonlocal pos
+            while True:
+                try:
+                    value, end = decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    if fill():
+                        continue
+                    raise
+                # Números podem estar truncados no fim do buffer
+                if not eof and _NUMBER_TAIL.match(buffer, end) and fill():
+                    continue
+                pos = end
+                return value
+
+        if next_char() != "{":
+            raise ValueError(f"{path}: esperado um objeto JSON")
+        pos += 1
+        if next_char() == "}":
+            return
+        while True:
+            next_char()
+            doc_id = decode()
+            if next_char() != ":":
+                raise ValueError(f"{path}: ':' esperado após a chave {doc_id!r}")
+            pos += 1
+            next_char()
+            yield doc_id, decode()
+            separator = next_char()
+            pos += 1
+            if separator == "}":
+                return
+            if separator != ",":
+                raise ValueError(f"{path}: ',' ou '}}' esperado após {doc_id!r}")
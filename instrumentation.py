@@ -0,0 +1,104 @@
+# instrumentation.py
+"""
+Instrumentação de requisições: spans de tempo por fase e profiler por amostragem.
+
+Os handlers marcam fases com `span("nome")`. Os tempos acumulados da
+requisição atual ficam em um `RequestTimings` guardado em uma ContextVar,
+que o middleware do app transforma no header `Server-Timing` e em campos
+estruturados de log.
+
+`sample_stacks` amostra as pilhas de todas as threads do processo e devolve
+o resultado no formato "folded" (`frame;frame;frame contagem`), aceito por
+flamegraph.pl, speedscope e inferno.
+"""
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional
+
+
+class RequestTimings:
+    """Durações acumuladas (em ms) por fase de uma requisição"""
+
+    __slots__ = ("start", "spans")
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.spans: Dict[str, float] = {}
+
+    def add(self, name: str, duration_ms: float):
+        self.spans[name] = self.spans.get(name, 0.0) + duration_ms
+
+    def total_ms(self) -> float:
+        return (time.perf_counter() - self.start) * 1000
+
+    def server_timing_header(self) -> str:
+        """Valor do header Server-Timing (inclui o span `total`)"""
+        entries = [f"{name};dur={duration:.2f}" for name, duration in self.spans.items()]
+        entries.append(f"total;dur={self.total_ms():.2f}")
+        return ", ".join(entries)
+
+    def log_fields(self) -> Dict[str, float]:
+        """Campos estruturados para log (`<fase>_ms`)"""
+        fields = {f"{name}_ms": round(duration, 2) for name, duration in self.spans.items()}
+        fields["total_ms"] = round(self.total_ms(), 2)
+        return fields
+
+
+_current_timings: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+
+
+def start_request() -> RequestTimings:
+    """Inicia a coleta de spans para a requisição atual"""
+    timings = RequestTimings()
+    _current_timings.set(timings)
+    return timings
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """Mede o bloco e acumula no span `name` da requisição atual (no-op fora de requisições)"""
+    timings = _current_timings.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, (time.perf_counter() - start) * 1000)
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({code.co_filename}:{frame.f_lineno})"
+
+
+def sample_stacks(seconds: float, interval: float = 0.005) -> str:
+    """
+    Amostra as pilhas de todas as threads durante `seconds` segundos
+    e retorna o perfil no formato folded (uma pilha por linha)
+    """
+    own_ident = threading.get_ident()
+    counts: Counter = Counter()
+    thread_names = {}
+    deadline = time.monotonic() + seconds
+
+    while time.monotonic() < deadline:
+        for thread in threading.enumerate():
+            thread_names[thread.ident] = thread.name
+        for ident, frame in sys._current_frames().items():
+            if ident == own_ident:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            stack.append(thread_names.get(ident, f"thread-{ident}"))
+            counts[";".join(reversed(stack))] += 1
+        time.sleep(interval)
+
+    return "".join(f"{stack} {count}\n" for stack, count in counts.most_common())
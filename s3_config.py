@@ -0,0 +1,59 @@
+# s3_config.py
+"""
+Criação do cliente S3 compartilhada por app.py, s3_probe.py e pelos scripts de teste.
+
+Os valores padrão vêm das variáveis de ambiente (lidas no momento da chamada,
+depois do load_dotenv de quem importa), então os resultados do s3_probe.py
+correspondem diretamente às configurações usadas pelo app:
+
+    S3_MAX_POOL_CONNECTIONS  (padrão 10)
+    S3_MAX_ATTEMPTS          (padrão 3)
+    S3_RETRY_MODE            (padrão "standard")
+    S3_ENDPOINT_URL          (vazio usa a AWS; ex.: emulador S3 local)
+"""
+import os
+from typing import Any, Dict, Optional
+
+import boto3
+from botocore.config import Config
+
+
+def s3_settings() -> Dict[str, Any]:
+    """Configuração efetiva do cliente S3 segundo as variáveis de ambiente"""
+    return {
+        "region": os.environ.get("AWS_REGION", "us-east-1"),
+        "max_pool_connections": int(os.environ.get("S3_MAX_POOL_CONNECTIONS", "10")),
+        "max_attempts": int(os.environ.get("S3_MAX_ATTEMPTS", "3")),
+        "retry_mode": os.environ.get("S3_RETRY_MODE", "standard"),
+        "endpoint_url": os.environ.get("S3_ENDPOINT_URL") or None,
+    }
+
+
+def create_s3_client(
+    max_pool_connections: Optional[int] = None,
+    max_attempts: Optional[int] = None,
+    retry_mode: Optional[str] = None,
+    endpoint_url: Optional[str] = None,
+):
+    """Cria o cliente S3; parâmetros omitidos usam os valores de `s3_settings()`"""
+    settings = s3_settings()
+    config = Config(
+        retries={
+            "max_attempts": max_attempts if max_attempts is not None else settings["max_attempts"],
+            "mode": retry_mode or settings["retry_mode"],
+        },
+        signature_version='s3v4',
+        max_pool_connections=(
+            max_pool_connections if max_pool_connections is not None
+            else settings["max_pool_connections"]
+        ),
+    )
+    return boto3.client(
+        "s3",
+        region_name=settings["region"],
+        endpoint_url=endpoint_url or settings["endpoint_url"],
+        aws_access_key_id=os.environ.get("AWS_ACCESS_KEY_ID"),
+        aws_secret_access_key=os.environ.get("AWS_SECRET_ACCESS_KEY"),
+        aws_session_token=os.environ.get("AWS_SESSION_TOKEN"),
+        config=config,
+    )
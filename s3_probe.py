@@ -0,0 +1,301 @@
+# Ferramenta de diagnóstico de throughput e latência do S3
+#
+# Varre tamanhos de objeto e níveis de concorrência para PUT, GET, HEAD e
+# transferências via URL pré-assinada, reportando MB/s, requisições/s e
+# percentis de latência. Também compara valores de max_pool_connections e
+# configurações de retry. O cliente é criado pelo mesmo s3_config.py do app.py
+# e os padrões vêm de S3_MAX_POOL_CONNECTIONS, S3_MAX_ATTEMPTS, S3_RETRY_MODE e
+# S3_ENDPOINT_URL, então sem argumentos o probe mede exatamente a configuração do app.
+#
+# Uso:
+#   python s3_probe.py --check                         # teste rápido de conexão/permissões
+#   python s3_probe.py --sizes 64KB,1MB,8MB --concurrency 1,8,32 --requests 40
+#   python s3_probe.py --pool-sizes 10,50 --retry-modes standard,adaptive
+#   python s3_probe.py --endpoint-url http://localhost:9000   # MinIO, LocalStack, moto...
+#
+# Os objetos de teste são criados sob --prefix e removidos ao final (exceto com --keep).
+import argparse
+import json
+import os
+import sys
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List
+
+from botocore.exceptions import ClientError
+from dotenv import load_dotenv
+
+from s3_config import create_s3_client, s3_settings
+
+# Carregar variáveis de ambiente
+load_dotenv()
+
+BUCKET = os.environ.get("S3_BUCKET_NAME")
+SETTINGS = s3_settings()
+
+OPERATIONS = ("put", "get", "head", "presigned-put", "presigned-get")
+
+
+def parse_size(value: str) -> int:
+    """Converte '64KB', '1MB', '512' em bytes"""
+    value = value.strip().upper()
+    for suffix, factor in (("GB", 1 << 30), ("MB", 1 << 20), ("KB", 1 << 10), ("B", 1)):
+        if value.endswith(suffix):
+            return int(float(value[:-len(suffix)]) * factor)
+    return int(value)
+
+
+def format_size(size: int) -> str:
+    for suffix, factor in (("GB", 1 << 30), ("MB", 1 << 20), ("KB", 1 << 10)):
+        if size >= factor:
+            return f"{size / factor:g}{suffix}"
+    return f"{size}B"
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Percentil por nearest-rank de uma lista já ordenada"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def run_batch(func: Callable[[int], int], count: int, concurrency: int) -> Dict[str, float]:
+    """Executa func(i) `count` vezes com `concurrency` threads e agrega as métricas"""
+    latencies: List[float] = []
+    errors = 0
+    transferred = 0
+
+    def timed(i: int):
+        start = time.perf_counter()
+        size = func(i)
+        return time.perf_counter() - start, size
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = [pool.submit(timed, i) for i in range(count)]
+        for future in futures:
+            try:
+                latency, size = future.result()
+            except Exception:
+                errors += 1
+                continue
+            latencies.append(latency)
+            transferred += size
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests": count,
+        "errors": errors,
+        "seconds": elapsed,
+        "mbPerSecond": transferred / (1 << 20) / elapsed if elapsed else 0.0,
+        "requestsPerSecond": len(latencies) / elapsed if elapsed else 0.0,
+        "p50Ms": percentile(latencies, 50) * 1000,
+        "p90Ms": percentile(latencies, 90) * 1000,
+        "p99Ms": percentile(latencies, 99) * 1000,
+        "maxMs": (latencies[-1] * 1000) if latencies else 0.0,
+    }
+
+
+def build_operations(s3_client, key_prefix: str, payload: bytes) -> Dict[str, Callable[[int], int]]:
+    """Funções de cada operação; recebem o índice do objeto e retornam bytes transferidos"""
+    size = len(payload)
+
+    def key(i: int) -> str:
+        return f"{key_prefix}{i:06d}"
+
+    def put(i):
+        s3_client.put_object(Bucket=BUCKET, Key=key(i), Body=payload, ContentType="application/pdf")
+        return size
+
+    def get(i):
+        body = s3_client.get_object(Bucket=BUCKET, Key=key(i))["Body"]
+        read = 0
+        for chunk in body.iter_chunks(256 * 1024):
+            read += len(chunk)
+        return read
+
+    def head(i):
+        s3_client.head_object(Bucket=BUCKET, Key=key(i))
+        return 0
+
+    def presigned_put(i):
+        url = s3_client.generate_presigned_url(
+            ClientMethod="put_object",
+            Params={"Bucket": BUCKET, "Key": key(i), "ContentType": "application/pdf"},
+            ExpiresIn=300,
+        )
+        request = urllib.request.Request(
+            url, data=payload, method="PUT", headers={"Content-Type": "application/pdf"}
+        )
+        with urllib.request.urlopen(request) as response:
+            response.read()
+        return size
+
+    def presigned_get(i):
+        url = s3_client.generate_presigned_url(
+            ClientMethod="get_object",
+            Params={"Bucket": BUCKET, "Key": key(i)},
+            ExpiresIn=300,
+        )
+        read = 0
+        with urllib.request.urlopen(url) as response:
+            while True:
+                chunk = response.read(256 * 1024)
+                if not chunk:
+                    break
+                read += len(chunk)
+        return read
+
+    return {
+        "put": put,
+        "get": get,
+        "head": head,
+        "presigned-put": presigned_put,
+        "presigned-get": presigned_get,
+    }
+
+
+def delete_prefix(s3_client, prefix: str):
+    """Remove os objetos de teste (em lotes de 1000)"""
+    paginator = s3_client.get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=BUCKET, Prefix=prefix):
+        objects = [{"Key": obj["Key"]} for obj in page.get("Contents", [])]
+        if objects:
+            s3_client.delete_objects(Bucket=BUCKET, Delete={"Objects": objects, "Quiet": True})
+
+
+def check_connection(s3_client) -> bool:
+    """Teste rápido de acesso: HeadBucket, PutObject, GetObject e DeleteObject"""
+    test_key = "documents/test-permission-check.txt"
+    steps = [
+        ("HeadBucket", lambda: s3_client.head_bucket(Bucket=BUCKET)),
+        ("PutObject", lambda: s3_client.put_object(Bucket=BUCKET, Key=test_key, Body=b"probe", ContentType="text/plain")),
+        ("GetObject", lambda: s3_client.get_object(Bucket=BUCKET, Key=test_key)["Body"].read()),
+        ("DeleteObject", lambda: s3_client.delete_object(Bucket=BUCKET, Key=test_key)),
+    ]
+    ok = True
+    for name, step in steps:
+        try:
+            step()
+            print(f"   ✅ {name}")
+        except ClientError as e:
+            print(f"   ❌ {name}: {e.response['Error']['Code']} - {e.response['Error']['Message']}")
+            ok = False
+    return ok
+
+
+def print_row(result: dict):
+    print(
+        f"  {result['operation']:<14} {format_size(result['sizeBytes']):>7} "
+        f"c={result['concurrency']:<3} pool={result['maxPoolConnections']:<4} "
+        f"retry={result['retryMode']}/{result['maxAttempts']:<2} "
+        f"{result['mbPerSecond']:9.2f} MB/s {result['requestsPerSecond']:8.1f} req/s  "
+        f"p50={result['p50Ms']:7.1f} p90={result['p90Ms']:7.1f} p99={result['p99Ms']:7.1f} ms"
+        + (f"  erros={result['errors']}" if result["errors"] else "")
+    )
+
+
+def csv_list(cast):
+    return lambda value: [cast(item) for item in value.split(",") if item.strip()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Diagnóstico de throughput e latência do S3")
+    parser.add_argument("--check", action="store_true", help="Apenas testa conexão e permissões")
+    parser.add_argument("--ops", type=csv_list(str), default=list(OPERATIONS),
+                        help=f"Operações ({','.join(OPERATIONS)})")
+    parser.add_argument("--sizes", type=csv_list(parse_size), default=[parse_size(s) for s in ("64KB", "1MB", "8MB")],
+                        help="Tamanhos de objeto (ex.: 64KB,1MB,8MB)")
+    parser.add_argument("--concurrency", type=csv_list(int), default=[1, 8, 32], help="Níveis de concorrência")
+    parser.add_argument("--requests", type=int, default=32, help="Requisições por combinação")
+    parser.add_argument("--pool-sizes", type=csv_list(int), default=[SETTINGS["max_pool_connections"]],
+                        help="Valores de max_pool_connections (padrão: S3_MAX_POOL_CONNECTIONS)")
+    parser.add_argument("--retry-modes", type=csv_list(str), default=[SETTINGS["retry_mode"]],
+                        help="Modos de retry (legacy,standard,adaptive; padrão: S3_RETRY_MODE)")
+    parser.add_argument("--max-attempts", type=csv_list(int), default=[SETTINGS["max_attempts"]],
+                        help="Valores de max_attempts (padrão: S3_MAX_ATTEMPTS)")
+    parser.add_argument("--endpoint-url", default=SETTINGS["endpoint_url"], help="Endpoint S3 (padrão: S3_ENDPOINT_URL)")
+    parser.add_argument("--prefix", default="probe/", help="Prefixo dos objetos de teste")
+    parser.add_argument("--keep", action="store_true", help="Não remover os objetos de teste")
+    parser.add_argument("--json", help="Salva os resultados em um arquivo JSON")
+    args = parser.parse_args(argv)
+
+    if not BUCKET:
+        print("\n❌ ERRO: S3_BUCKET_NAME não está configurado no .env")
+        sys.exit(1)
+
+    unknown = set(args.ops) - set(OPERATIONS)
+    if unknown:
+        parser.error(f"Operações desconhecidas: {', '.join(sorted(unknown))}")
+
+    print("=" * 60)
+    print("DIAGNÓSTICO S3")
+    print("=" * 60)
+    print(f"   Região: {SETTINGS['region']}")
+    print(f"   Bucket: {BUCKET}")
+    print(f"   Endpoint: {args.endpoint_url or 'AWS'}")
+
+    if args.check:
+        print()
+        sys.exit(0 if check_connection(create_s3_client(endpoint_url=args.endpoint_url)) else 1)
+
+    run_prefix = f"{args.prefix.rstrip('/')}/{int(time.time())}/"
+    results = []
+    cleanup_client = create_s3_client(endpoint_url=args.endpoint_url)
+
+    # GET/HEAD/presigned-get precisam dos objetos criados pelo PUT
+    ops = [op for op in OPERATIONS if op in args.ops]
+    needs_seed = any(op in ops for op in ("get", "head", "presigned-get")) and "put" not in ops
+
+    try:
+        for pool_size in args.pool_sizes:
+            for retry_mode in args.retry_modes:
+                for max_attempts in args.max_attempts:
+                    s3_client = create_s3_client(pool_size, max_attempts, retry_mode, args.endpoint_url)
+                    print(f"\n--- max_pool_connections={pool_size} retries={retry_mode}/{max_attempts} ---")
+
+                    for size in args.sizes:
+                        payload = os.urandom(size)
+                        key_prefix = f"{run_prefix}{size}/"
+                        operations = build_operations(s3_client, key_prefix, payload)
+                        if needs_seed:
+                            run_batch(operations["put"], args.requests, max(args.concurrency))
+
+                        for concurrency in args.concurrency:
+                            for op in ops:
+                                metrics = run_batch(operations[op], args.requests, concurrency)
+                                result = {
+                                    "operation": op,
+                                    "sizeBytes": size,
+                                    "concurrency": concurrency,
+                                    "maxPoolConnections": pool_size,
+                                    "retryMode": retry_mode,
+                                    "maxAttempts": max_attempts,
+                                    **metrics,
+                                }
+                                results.append(result)
+                                print_row(result)
+    except KeyboardInterrupt:
+        print("\n⚠ Interrompido")
+    finally:
+        if not args.keep:
+            delete_prefix(cleanup_client, run_prefix)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n✓ Resultados salvos em {args.json}")
+
+    print("\nDicas:")
+    print("  - Se o throughput parar de crescer com concorrência > max_pool_connections,")
+    print("    aumente S3_MAX_POOL_CONNECTIONS no .env (usado pelo app.py)")
+    print("  - O app.py usa no mínimo ARCHIVE_PREFETCH_WINDOW + 2 conexões, mesmo que")
+    print("    S3_MAX_POOL_CONNECTIONS seja menor")
+    print("  - URLs pré-assinadas usam uma conexão nova por requisição (sem pool)")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,24 @@ class PDFManager {
         this.apiBase = '/api';
         this.selectedFile = null;
         this.currentDocumentId = null;
+
+        // Estado da grade virtualizada de documentos
+        this.pageSize = 200;
+        this.maxPageSize = 1000; // limite do backend para ?limit=
+        this.overscanRows = 3;
+        this.documents = [];
+        this.documentIndex = new Map();
+        this.totalDocuments = 0;
+        this.renderedCards = new Map();
+        this.cardPool = [];
+        this.dirtyDocuments = new Set();
+        this.cardHeight = 0;
+        this.columns = 1;
+        this.rowGap = 0;
+        this.renderScheduled = false;
+        this.loadingMore = false;
+        this.loadGeneration = 0;
+
         this.init();
     }
 
@@ -48,6 +66,22 @@ class PDFManager {
         const refreshBtn = document.getElementById('refresh-documents');
         refreshBtn.addEventListener('click', () => this.loadDocuments());
 
+        // Documents grid (delegação de eventos: os cards são reciclados)
+        const documentsGrid = document.getElementById('documents-grid');
+        documentsGrid.innerHTML = '';
+        documentsGrid.addEventListener('click', (e) => {
+            const card = e.target.closest('.document-card');
+            if (!card) return;
+            const doc = this.documentIndex.get(card.dataset.documentId);
+            if (doc) this.viewDocument(doc);
+        });
+
+        window.addEventListener('scroll', () => this.scheduleRender(), { passive: true });
+        window.addEventListener('resize', () => {
+            this.cardHeight = 0;
+            this.scheduleRender();
+        });
+
         // Modal
         const modalClose = document.getElementById('modal-close');
         modalClose.addEventListener('click', () => this.closeModal());
@@ -203,79 +237,278 @@ class PDFManager {
     }
 
     async loadDocuments() {
-        const documentsGrid = document.getElementById('documents-grid');
+        // Recarrega todas as páginas já carregadas e aplica um diff por documentId
+        const generation = ++this.loadGeneration;
+        const wanted = Math.max(this.pageSize, this.documents.length);
+
         const documentsLoading = document.getElementById('documents-loading');
         const documentsEmpty = document.getElementById('documents-empty');
 
-        documentsLoading.style.display = 'block';
-        documentsEmpty.style.display = 'none';
-        documentsGrid.innerHTML = '';
+        if (this.documents.length === 0) {
+            documentsLoading.style.display = 'block';
+            documentsEmpty.style.display = 'none';
+        }
 
         try {
-            const response = await fetch(`${this.apiBase}/documents`);
+            const documents = [];
+            const seen = new Set();
+            let total = 0;
+
+            // Busca em blocos de até maxPageSize (limite do backend)
+            for (let offset = 0; offset < wanted; offset += this.maxPageSize) {
+                const limit = Math.min(this.maxPageSize, wanted - offset);
+                const data = await this.fetchDocumentsPage(offset, limit);
+
+                // Ignora respostas de carregamentos mais antigos
+                if (generation !== this.loadGeneration) return;
+
+                const page = data.documents || [];
+                total = data.total ?? documents.length + page.length;
+
+                // A lista pode mudar entre blocos: ignora documentos repetidos
+                page.forEach(doc => {
+                    if (!seen.has(doc.documentId)) {
+                        seen.add(doc.documentId);
+                        documents.push(doc);
+                    }
+                });
+
+                if (page.length < limit) break;
+            }
 
-            if (!response.ok) {
-                throw new Error('Erro ao carregar documentos');
+            this.totalDocuments = total;
+            this.applyDocuments(documents);
+
+        } catch (error) {
+            console.error('Load documents error:', error);
+            this.showNotification('Erro ao carregar documentos: ' + error.message, 'error');
+        } finally {
+            if (generation === this.loadGeneration) {
+                documentsLoading.style.display = 'none';
             }
+        }
+    }
 
-            const data = await response.json();
-            const documents = data.documents || [];
+    async loadMoreDocuments() {
+        if (this.loadingMore || this.documents.length >= this.totalDocuments) return;
 
-            if (documents.length === 0) {
-                documentsEmpty.style.display = 'block';
-            } else {
-                this.renderDocuments(documents);
+        this.loadingMore = true;
+        const generation = this.loadGeneration;
+
+        try {
+            const data = await this.fetchDocumentsPage(this.documents.length, this.pageSize);
+            if (generation !== this.loadGeneration) return;
+
+            this.totalDocuments = data.total ?? this.totalDocuments;
+
+            // Acrescenta apenas documentos ainda não conhecidos (a lista pode ter mudado)
+            const newDocuments = (data.documents || []).filter(
+                doc => !this.documentIndex.has(doc.documentId)
+            );
+            newDocuments.forEach(doc => this.documentIndex.set(doc.documentId, doc));
+            this.documents = this.documents.concat(newDocuments);
+
+            if (newDocuments.length === 0) {
+                // Nada novo nesta página: evita buscar indefinidamente
+                this.totalDocuments = this.documents.length;
             }
 
+            this.scheduleRender();
+
         } catch (error) {
-            console.error('Load documents error:', error);
+            console.error('Load more documents error:', error);
             this.showNotification('Erro ao carregar documentos: ' + error.message, 'error');
         } finally {
-            documentsLoading.style.display = 'none';
+            this.loadingMore = false;
         }
     }
 
-    renderDocuments(documents) {
-        const documentsGrid = document.getElementById('documents-grid');
-        documentsGrid.innerHTML = '';
+    async fetchDocumentsPage(offset, limit) {
+        const response = await fetch(
+            `${this.apiBase}/documents?offset=${offset}&limit=${limit}`
+        );
+
+        if (!response.ok) {
+            throw new Error('Erro ao carregar documentos');
+        }
+
+        return response.json();
+    }
+
+    applyDocuments(documents) {
+        // Diff por documentId: inserções, atualizações e remoções
+        const nextIndex = new Map();
 
         documents.forEach(doc => {
-            const docCard = this.createDocumentCard(doc);
-            documentsGrid.appendChild(docCard);
+            const previous = this.documentIndex.get(doc.documentId);
+            if (previous && this.documentSignature(previous) !== this.documentSignature(doc)) {
+                this.dirtyDocuments.add(doc.documentId);
+            }
+            nextIndex.set(doc.documentId, doc);
         });
+
+        this.documentIndex.forEach((doc, documentId) => {
+            if (!nextIndex.has(documentId)) {
+                this.releaseCard(documentId);
+            }
+        });
+
+        this.documents = documents;
+        this.documentIndex = nextIndex;
+        this.scheduleRender();
+    }
+
+    removeDocuments(documentIds) {
+        const removed = new Set(documentIds);
+        removed.forEach(documentId => this.releaseCard(documentId));
+        this.documents = this.documents.filter(doc => !removed.has(doc.documentId));
+        removed.forEach(documentId => this.documentIndex.delete(documentId));
+        this.totalDocuments = Math.max(0, this.totalDocuments - removed.size);
+        this.scheduleRender();
     }
 
-    createDocumentCard(doc) {
+    documentSignature(doc) {
+        return `${doc.originalFilename}|${doc.sizeBytes}|${doc.uploadedAt}|${doc.status}`;
+    }
+
+    scheduleRender() {
+        if (this.renderScheduled) return;
+        this.renderScheduled = true;
+        requestAnimationFrame(() => {
+            this.renderScheduled = false;
+            this.renderDocuments();
+        });
+    }
+
+    measureGrid(documentsGrid) {
+        const style = getComputedStyle(documentsGrid);
+
+        // gridTemplateColumns computado já vem resolvido em trilhas ("300px 300px ...")
+        this.columns = Math.max(1, style.gridTemplateColumns.split(' ').filter(Boolean).length);
+        this.rowGap = parseFloat(style.rowGap) || 0;
+
+        // Mede a altura de um card real uma única vez (todos têm a mesma altura)
+        if (!this.cardHeight) {
+            const probe = this.acquireCard();
+            probe.style.visibility = 'hidden';
+            this.fillDocumentCard(probe, this.documents[0]);
+            documentsGrid.appendChild(probe);
+            this.cardHeight = probe.offsetHeight;
+            probe.remove();
+            probe.style.visibility = '';
+            this.cardPool.push(probe);
+        }
+    }
+
+    renderDocuments() {
+        // Renderiza apenas a janela visível de cards, reciclando nós do DOM
+        const documentsGrid = document.getElementById('documents-grid');
+        const documentsEmpty = document.getElementById('documents-empty');
+
+        if (this.documents.length === 0) {
+            this.renderedCards.forEach((card, documentId) => this.releaseCard(documentId));
+            documentsGrid.style.paddingTop = '';
+            documentsGrid.style.paddingBottom = '';
+            documentsEmpty.style.display = this.totalDocuments === 0 ? 'block' : 'none';
+            return;
+        }
+        documentsEmpty.style.display = 'none';
+
+        this.measureGrid(documentsGrid);
+
+        const rowHeight = this.cardHeight + this.rowGap;
+        const totalRows = Math.ceil(this.documents.length / this.columns);
+        const viewportTop = -(documentsGrid.getBoundingClientRect().top);
+
+        const firstRow = Math.max(
+            0, Math.floor(viewportTop / rowHeight) - this.overscanRows
+        );
+        const lastRow = Math.min(
+            totalRows,
+            Math.ceil((viewportTop + window.innerHeight) / rowHeight) + this.overscanRows
+        );
+        const start = Math.min(firstRow * this.columns, this.documents.length);
+        const end = Math.min(lastRow * this.columns, this.documents.length);
+
+        const visible = this.documents.slice(start, end);
+        const visibleIds = new Set(visible.map(doc => doc.documentId));
+
+        // Libera cards que saíram da janela
+        Array.from(this.renderedCards.keys()).forEach(documentId => {
+            if (!visibleIds.has(documentId)) {
+                this.releaseCard(documentId);
+            }
+        });
+
+        // Reutiliza, preenche e ordena os cards da janela
+        let previous = null;
+        visible.forEach(doc => {
+            let card = this.renderedCards.get(doc.documentId);
+            if (!card) {
+                card = this.acquireCard();
+                this.fillDocumentCard(card, doc);
+                this.renderedCards.set(doc.documentId, card);
+            } else if (this.dirtyDocuments.has(doc.documentId)) {
+                this.fillDocumentCard(card, doc);
+            }
+            this.dirtyDocuments.delete(doc.documentId);
+
+            const expected = previous ? previous.nextSibling : documentsGrid.firstChild;
+            if (card !== expected) {
+                documentsGrid.insertBefore(card, expected);
+            }
+            previous = card;
+        });
+
+        documentsGrid.style.paddingTop = `${firstRow * rowHeight}px`;
+        documentsGrid.style.paddingBottom = `${Math.max(0, totalRows - lastRow) * rowHeight}px`;
+
+        // Busca mais documentos quando a janela se aproxima do fim da lista carregada
+        if (end >= this.documents.length - this.columns * this.overscanRows) {
+            this.loadMoreDocuments();
+        }
+    }
+
+    acquireCard() {
+        return this.cardPool.pop() || this.createDocumentCard();
+    }
+
+    releaseCard(documentId) {
+        const card = this.renderedCards.get(documentId);
+        if (!card) return;
+        card.remove();
+        this.renderedCards.delete(documentId);
+        this.cardPool.push(card);
+    }
+
+    createDocumentCard() {
         const card = document.createElement('div');
         card.className = 'document-card';
 
-        const filename = doc.originalFilename || doc.filename || 'Documento';
-        const sizeText = doc.sizeBytes ? this.formatFileSize(doc.sizeBytes) : 'N/A';
-        const dateText = doc.uploadedAt ? this.formatDate(doc.uploadedAt) : '';
-
         card.innerHTML = `
             <div class="document-icon">📄</div>
             <div class="document-info">
-                <h4 class="document-title">${this.escapeHtml(filename)}</h4>
-                <p class="document-meta">📅 ${dateText}</p>
-                <p class="document-size">📦 ${sizeText}</p>
+                <h4 class="document-title"></h4>
+                <p class="document-meta"></p>
+                <p class="document-size"></p>
             </div>
             <div class="document-actions">
                 <button class="btn-icon view-btn" title="Visualizar detalhes">👁️</button>
             </div>
         `;
 
-        const viewBtn = card.querySelector('.view-btn');
-        viewBtn.addEventListener('click', (e) => {
-            e.stopPropagation();
-            this.viewDocument(doc);
-        });
+        return card;
+    }
 
-        card.addEventListener('click', () => {
-            this.viewDocument(doc);
-        });
+    fillDocumentCard(card, doc) {
+        const filename = doc.originalFilename || doc.filename || 'Documento';
+        const sizeText = doc.sizeBytes ? this.formatFileSize(doc.sizeBytes) : 'N/A';
+        const dateText = doc.uploadedAt ? this.formatDate(doc.uploadedAt) : '';
 
-        return card;
+        card.dataset.documentId = doc.documentId;
+        card.querySelector('.document-title').textContent = filename;
+        card.querySelector('.document-meta').textContent = `📅 ${dateText}`;
+        card.querySelector('.document-size').textContent = `📦 ${sizeText}`;
     }
 
     viewDocument(doc) {
@@ -345,9 +578,10 @@ class PDFManager {
                 throw new Error('Erro ao deletar documento');
             }
 
+            const deletedId = this.currentDocumentId;
             this.showNotification('Documento deletado com sucesso!', 'success');
             this.closeModal();
-            this.loadDocuments();
+            this.removeDocuments([deletedId]);
 
         } catch (error) {
             console.error('Delete error:', error);
@@ -0,0 +1,116 @@
+# Testes do leitor em streaming e da carga/gravação dos metadados (document_store)
+#
+# Uso:
+#   python -m unittest test_document_store
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from document_store import DocumentRecord, dump_records, iter_entries, load_records
+
+# Valores que exercitam as fronteiras do buffer: números com expoente e
+# fração, literais, escapes, unicode e objetos aninhados
+SAMPLE = {
+    "a": 1e5,
+    "b": -1.5e-3,
+    "c": 123456789,
+    "d": 0,
+    "e": True,
+    "f": None,
+    "g": "texto com \"aspas\", \\barras\\ e ç ã 漢字",
+    "h": [1, 2.5, {"x": [None, False]}],
+    "i": {
+        "documentId": "i",
+        "originalFilename": "relatório final.pdf",
+        "uploadedAt": "2024-03-04T05:06:07.123456",
+        "status": "uploaded",
+        "sizeBytes": 10240,
+    },
+    "": {},
+    "j": 2.0,
+    "k": 12e-7,
+}
+
+
+class IterEntriesTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name) / "documents_metadata.json"
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, text: str):
+        self.path.write_text(text, encoding="utf-8")
+
+    def assert_matches_json_load(self, text: str):
+        self.write(text)
+        expected = list(json.loads(text).items())
+        for chunk_size in range(1, 40):
+            with self.subTest(chunk_size=chunk_size):
+                self.assertEqual(list(iter_entries(self.path, chunk_size=chunk_size)), expected)
+
+    def test_indented(self):
+        self.assert_matches_json_load(json.dumps(SAMPLE, indent=2, ensure_ascii=False))
+
+    def test_compact(self):
+        self.assert_matches_json_load(json.dumps(SAMPLE, separators=(",", ":")))
+
+    def test_extra_whitespace(self):
+        self.assert_matches_json_load(
+            ' \n{ "a" :\t1e5 , "b":1.25\n,"c" : [ 1 ]\n\n}\n '
+        )
+
+    def test_number_last(self):
+        self.assert_matches_json_load('{"a":1e5}')
+
+    def test_empty(self):
+        self.assert_matches_json_load("{}")
+        self.assert_matches_json_load(" { \n } ")
+
+    def test_invalid(self):
+        for text in ('[]', '{"a" 1}', '{"a": 1 "b": 2}', '{"a": tru}'):
+            with self.subTest(text=text):
+                self.write(text)
+                with self.assertRaises(ValueError):
+                    list(iter_entries(self.path, chunk_size=2))
+
+
+class LoadRecordsTest(unittest.TestCase):
+    def test_unrecognized_entries_are_written_back_unchanged(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "documents_metadata.json"
+            original = {
+                "a": {**SAMPLE["i"], "documentId": "a"},
+                "b": {"documentId": "b", "originalFilename": "b.pdf", "uploadedAt": "03/04/2024"},
+                "c": [1, 2],
+                "d": {"documentId": "d", "originalFilename": "d.pdf",
+                      "uploadedAt": "2024-01-01T00:00:00", "sizeBytes": "abc"},
+            }
+            path.write_text(json.dumps(original))
+
+            records = load_records(path)
+            self.assertEqual(list(records), ["a"])
+            self.assertEqual(set(records.unrecognized), {"b", "c", "d"})
+            self.assertIs(records["a"].document_id, next(iter(records)))
+
+            records["a"].status = "error"
+            dump_records(records, path)
+            saved = json.loads(path.read_text())
+            self.assertEqual(saved["a"]["status"], "error")
+            for key in ("b", "c", "d"):
+                self.assertEqual(saved[key], original[key])
+
+    def test_from_dict_rejects_invented_values(self):
+        base = {"documentId": "x", "originalFilename": "x.pdf", "uploadedAt": "2024-01-01T00:00:00"}
+        DocumentRecord.from_dict(base)
+        for override in ({"uploadedAt": None}, {"sizeBytes": "1"}, {"sizeBytes": True},
+                         {"status": 1}, {"contentType": []}):
+            with self.subTest(override=override):
+                with self.assertRaises(ValueError):
+                    DocumentRecord.from_dict({**base, **override})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,10 +1,10 @@
 # Script de teste para verificar conexão com S3
 import os
 from dotenv import load_dotenv
-import boto3
-from botocore.config import Config
 from botocore.exceptions import ClientError
 
+from s3_config import create_s3_client
+
 # Carregar variáveis de ambiente
 load_dotenv()
 
@@ -27,21 +27,9 @@ if not BUCKET:
     print("\n❌ ERRO: S3_BUCKET_NAME não está configurado no .env")
     exit(1)
 
-# Configurar cliente S3
-boto_config = Config(
-    retries={"max_attempts": 3, "mode": "standard"},
-    signature_version='s3v4'
-)
-
 try:
-    s3_client = boto3.client(
-        "s3",
-        region_name=REGION,
-        aws_access_key_id=os.environ.get("AWS_ACCESS_KEY_ID"),
-        aws_secret_access_key=os.environ.get("AWS_SECRET_ACCESS_KEY"),
-        aws_session_token=os.environ.get("AWS_SESSION_TOKEN"),
-        config=boto_config
-    )
+    # Mesmo cliente do app.py e do s3_probe.py (s3_config.py, inclui S3_ENDPOINT_URL)
+    s3_client = create_s3_client()
     
     print("\n✓ Cliente S3 criado com sucesso")
     
@@ -1,17 +1,17 @@
 """
 Script para testar permissões de upload no S3
 """
-import boto3
 from botocore.exceptions import ClientError
 import os
 from dotenv import load_dotenv
 
+from s3_config import create_s3_client
+
 # Carrega variáveis de ambiente
 load_dotenv()
 
 # Configurações
 AWS_ACCESS_KEY_ID = os.getenv('AWS_ACCESS_KEY_ID')
-AWS_SECRET_ACCESS_KEY = os.getenv('AWS_SECRET_ACCESS_KEY')
 AWS_REGION = os.getenv('AWS_REGION', 'us-east-1')
 S3_BUCKET_NAME = os.getenv('S3_BUCKET_NAME')
 
@@ -23,13 +23,8 @@ print(f"Região: {AWS_REGION}")
 print(f"Access Key: {AWS_ACCESS_KEY_ID}")
 print("=" * 60)
 
-# Cria cliente S3
-s3 = boto3.client(
-    's3',
-    aws_access_key_id=AWS_ACCESS_KEY_ID,
-    aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
-    region_name=AWS_REGION
-)
+# Cria cliente S3 (s3_config.py, mesma configuração do app.py)
+s3 = create_s3_client()
 
 # Teste 1: Verificar acesso ao bucket
 print("\n1️⃣  Testando acesso ao bucket (HeadBucket)...")
@@ -0,0 +1,166 @@
+# zip_stream.py
+"""
+Geração de arquivos ZIP em streaming com prefetch paralelo das entradas.
+
+`iter_zip` recebe as entradas na ordem do arquivo e devolve os bytes do ZIP
+conforme ele é montado. Até `window` entradas são baixadas em paralelo, cada
+uma em uma fila limitada a `queue_chunks` blocos, então a memória usada fica
+em torno de `window * queue_chunks * chunk_size`, independente do tamanho do
+arquivo final. As entradas são gravadas sem compressão (ZIP_STORED), já que
+PDFs normalmente já são comprimidos.
+"""
+import queue
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import BinaryIO, Callable, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+# Abre o conteúdo de uma entrada: retorna (tamanho, stream com read()/close()),
+# por exemplo o StreamingBody de um get_object do boto3
+Opener = Callable[[], Tuple[int, BinaryIO]]
+
+_ZIP64_LIMIT = zipfile.ZIP64_LIMIT
+_DONE = object()
+
+
+class ZipEntry(NamedTuple):
+    name: str
+    opener: Opener
+    modified: Optional[datetime] = None
+
+
+class _ChunkBuffer:
+    """Destino não-seekable do ZipFile; acumula bytes até serem drenados"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> Iterator[bytes]:
+        chunks, self._chunks = self._chunks, []
+        if chunks:
+            yield b"".join(chunks)
+
+
+class _Prefetch:
+    """Baixa uma entrada em background para uma fila limitada"""
+
+    def __init__(self, entry: ZipEntry, queue_chunks: int, chunk_size: int, cancelled: threading.Event):
+        self.entry = entry
+        self.chunk_size = chunk_size
+        self.queue: queue.Queue = queue.Queue(maxsize=queue_chunks)
+        self.size: Optional[int] = None
+        self.ready = threading.Event()
+        self.error: Optional[BaseException] = None
+        self._cancelled = cancelled
+
+    def _put(self, item) -> bool:
+        # put com timeout para desistir se o download for cancelado
+        while not self._cancelled.is_set():
+            try:
+                self.queue.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def run(self):
+        stream = None
+        try:
+            self.size, stream = self.entry.opener()
+            self.ready.set()
+            while True:
+                chunk = stream.read(self.chunk_size)
+                if not chunk:
+                    break
+                if not self._put(chunk):
+                    return
+        except BaseException as e:
+            self.error = e
+            self.ready.set()
+        finally:
+            # Libera a conexão mesmo em cancelamento ou erro no meio da leitura
+            if stream is not None:
+                stream.close()
+        self._put(_DONE)
+
+    def chunks(self) -> Iterator[bytes]:
+        while True:
+            item = self.queue.get()
+            if item is _DONE:
+                break
+            yield item
+        if self.error is not None:
+            raise self.error
+
+
+def unique_names(names: Iterable[str]) -> List[str]:
+    """Sanitiza nomes de entrada e resolve duplicados ("a.pdf", "a (1).pdf", ...)"""
+    seen = set()
+    result = []
+    for name in names:
+        name = name.replace("\\", "/").split("/")[-1].strip() or "documento.pdf"
+        if name in (".", ".."):
+            name = "documento.pdf"
+        base, dot, ext = name.rpartition(".")
+        if not dot:
+            base, ext = name, ""
+        candidate = name
+        counter = 1
+        while candidate in seen:
+            candidate = f"{base} ({counter}){dot}{ext}"
+            counter += 1
+        seen.add(candidate)
+        result.append(candidate)
+    return result
+
+
+def iter_zip(
+    entries: List[ZipEntry],
+    window: int = 4,
+    queue_chunks: int = 4,
+    chunk_size: int = 256 * 1024,
+) -> Iterator[bytes]:
+    """Gera os bytes de um ZIP (ZIP_STORED) com as entradas baixadas em paralelo"""
+    out = _ChunkBuffer()
+    cancelled = threading.Event()
+    prefetches = [_Prefetch(entry, queue_chunks, chunk_size, cancelled) for entry in entries]
+
+    with ThreadPoolExecutor(max_workers=max(1, window), thread_name_prefix="zip-prefetch") as pool:
+        try:
+            # Janela de prefetch: mantém até `window` downloads à frente do escritor
+            for prefetch in prefetches[:window]:
+                pool.submit(prefetch.run)
+
+            with zipfile.ZipFile(out, "w", compression=zipfile.ZIP_STORED) as zf:
+                for index, prefetch in enumerate(prefetches):
+                    prefetch.ready.wait()
+                    if prefetch.error is not None:
+                        raise prefetch.error
+
+                    info = zipfile.ZipInfo(prefetch.entry.name)
+                    if prefetch.entry.modified is not None and prefetch.entry.modified.year >= 1980:
+                        info.date_time = prefetch.entry.modified.timetuple()[:6]
+                    info.compress_type = zipfile.ZIP_STORED
+                    info.file_size = prefetch.size or 0
+
+                    with zf.open(info, "w", force_zip64=info.file_size >= _ZIP64_LIMIT) as dest:
+                        for chunk in prefetch.chunks():
+                            dest.write(chunk)
+                            yield from out.drain()
+
+                    if index + window < len(prefetches):
+                        pool.submit(prefetches[index + window].run)
+                    yield from out.drain()
+
+            # Diretório central (escrito ao fechar o ZipFile)
+            yield from out.drain()
+        finally:
+            cancelled.set()